@@ -8,15 +8,55 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
 import csv
-from datetime import datetime
-from collections import defaultdict
+import gzip
+import io
+import zipfile
+import math
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from collections import Counter, defaultdict, deque
+from itertools import repeat
+from operator import itemgetter
 import re
 
+try:
+    import zstandard  # Optional: only needed to read .csv.zst files
+except ImportError:
+    zstandard = None
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Configuration
-TRANSACTIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transactions')
+TRANSACTIONS_DIRECTORY = os.environ.get(
+    'ANALYTICS_TRANSACTIONS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transactions')
+)
+PORT = int(os.environ.get('ANALYTICS_PORT', 8082))
+CSV_PARSER = os.environ.get('ANALYTICS_CSV_PARSER', 'fast')  # 'fast' (positional) or 'dictreader'
+CSV_READ_BUFFER_SIZE = 1024 * 1024  # Characters of lines read per chunk by the fast parser (readlines hint on a text stream)
+
+# Time-series downsampling
+TIME_SERIES_RESOLUTIONS = ['day', 'week', 'month']  # Bucket sizes, finest first ('auto' picks one)
+MIN_MAX_POINTS = 3  # LTTB always keeps the first and last point plus at least one more
+
+# Reliability monitoring
+RELIABILITY_EWMA_ALPHA = 0.2  # Weight of each new day in the failure-rate baseline
+RELIABILITY_Z_THRESHOLD = 3.0  # Standard deviations above baseline that raise an alert
+RELIABILITY_MIN_BASELINE_DAYS = 5  # Days of history needed before a kiosk/client can alert
+RELIABILITY_MIN_TRANSACTIONS = 20  # Minimum transactions in a day (kiosk or client) to evaluate
+RELIABILITY_WINDOW_MINUTES = 60  # Rolling window length for intraday spike detection
+RELIABILITY_MIN_WINDOW_TRANSACTIONS = 10  # Minimum transactions in a window to evaluate
+RELIABILITY_MIN_WINDOW_FAILURES = 3  # Minimum failures in a window before it can be flagged as a spike
+RELIABILITY_RATE_FLOOR = 0.01  # Minimum standard deviation, so a near-zero baseline does not alert on noise
+RELIABILITY_REFRESH_SECONDS = 60  # How often the background monitor looks for new transaction files
+RELIABILITY_STATE_FILE = os.environ.get(  # Persisted baselines, so a restart resumes instead of re-reading history
+    'ANALYTICS_RELIABILITY_STATE',
+    os.path.join(TRANSACTIONS_DIRECTORY, '.reliability_state.json')
+)
 
 # ============================================================================
 # DIRECTORY & FILE DISCOVERY
@@ -38,48 +78,220 @@ def get_kiosk_directories():
     return sorted(kiosks)
 
 
-def get_dates_for_kiosk(kiosk_id):
-    """Get available dates for a specific kiosk by scanning transaction files"""
-    dates = set()
+# Transaction history may be plain CSV, per-day compressed CSV, or a monthly zip bundle:
+#   transactions_KIOSK_MMDDYY.csv / .csv.gz / .csv.zst
+#   archive_KIOSK_YYYYMM.zip (members named transactions_KIOSK_MMDDYY.csv)
+TRANSACTION_FILE_PATTERN = re.compile(r'transactions_\d+_(\d{6})\.csv(\.gz|\.zst)?$')
+ARCHIVE_FILE_PATTERN = re.compile(r'archive_\d+_(\d{6})\.zip$')
+TRANSACTION_FILE_SUFFIXES = ['.csv', '.csv.gz', '.csv.zst']  # Lookup order when several exist
+
+
+def _file_date_to_iso(date_str):
+    """Convert an MMDDYY filename date to YYYY-MM-DD, or None if invalid"""
+    try:
+        month = date_str[:2]
+        day = date_str[2:4]
+        year = date_str[4:6]
+        return datetime.strptime(f"20{year}-{month}-{day}", '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _file_date_after(date_str, since):
+    """Cheap check that an MMDDYY filename date is later than since (YYYY-MM-DD), before parsing it"""
+    return since is None or f"20{date_str[4:6]}-{date_str[:2]}-{date_str[2:4]}" > since
+
+
+def get_transaction_sources(kiosk_id, since=None):
+    """
+    Map each available date for a kiosk to its transaction source (file_path, member).
+    member is None for plain or compressed files and the CSV name inside a monthly archive.
+    Loose files take precedence over archived copies of the same date.
+    If since (YYYY-MM-DD) is given, only later dates are returned and archives of earlier months are not opened.
+    """
+    sources = {}
     kiosk_dir = os.path.join(TRANSACTIONS_DIRECTORY, f'kiosk_{kiosk_id}')
 
     if not os.path.exists(kiosk_dir):
-        return sorted(list(dates))
+        return sources
 
-    # Look for files like: transactions_0202_110625.csv
+    loose = {}
+    archives = []
     for filename in os.listdir(kiosk_dir):
-        if filename.startswith('transactions_') and filename.endswith('.csv'):
-            # Extract date from filename: transactions_KIOSK_MMDDYY.csv
-            match = re.match(r'transactions_\d+_(\d{6})\.csv', filename)
-            if match:
-                date_str = match.group(1)
-                try:
-                    month = date_str[:2]
-                    day = date_str[2:4]
-                    year = date_str[4:6]
-                    date_obj = datetime.strptime(f"20{year}-{month}-{day}", '%Y-%m-%d')
-                    dates.add(date_obj.strftime('%Y-%m-%d'))
-                except:
-                    continue
+        # Look for files like: transactions_0202_110625.csv(.gz|.zst)
+        match = TRANSACTION_FILE_PATTERN.match(filename)
+        if match:
+            if not _file_date_after(match.group(1), since):
+                continue
+            suffix = '.csv' + (match.group(2) or '')
+            if suffix == '.csv.zst' and zstandard is None:
+                continue
+            date = _file_date_to_iso(match.group(1))
+            if date:
+                rank = TRANSACTION_FILE_SUFFIXES.index(suffix)
+                if date not in loose or rank < loose[date][0]:
+                    loose[date] = (rank, os.path.join(kiosk_dir, filename))
+        else:
+            match = ARCHIVE_FILE_PATTERN.match(filename)
+            if match and (since is None or match.group(1) >= since[:7].replace('-', '')):
+                archives.append(os.path.join(kiosk_dir, filename))
+
+    for archive_path in sorted(archives):
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                members = archive.namelist()
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"Error reading archive {archive_path}: {str(e)}")
+            continue
+        for member in members:
+            match = TRANSACTION_FILE_PATTERN.match(member)
+            if match and not match.group(2) and _file_date_after(match.group(1), since):
+                date = _file_date_to_iso(match.group(1))
+                if date:
+                    sources[date] = (archive_path, member)
+
+    for date, (_, file_path) in loose.items():
+        sources[date] = (file_path, None)
+
+    return sources
+
+
+def find_transaction_source(kiosk_id, date):
+    """Locate the transaction source (file_path, member) for a kiosk and YYYY-MM-DD date, or None"""
+    kiosk_dir = os.path.join(TRANSACTIONS_DIRECTORY, f'kiosk_{kiosk_id}')
+
+    # Convert date format YYYY-MM-DD to MMDDYY for filename
+    try:
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return None
+    filename = f'transactions_{kiosk_id}_{date_obj.strftime("%m%d%y")}.csv'
+
+    for suffix in TRANSACTION_FILE_SUFFIXES:
+        if suffix == '.csv.zst' and zstandard is None:
+            continue
+        file_path = os.path.join(kiosk_dir, filename[:-len('.csv')] + suffix)
+        if os.path.exists(file_path):
+            return file_path, None
+
+    archive_path = os.path.join(kiosk_dir, f'archive_{kiosk_id}_{date_obj.strftime("%Y%m")}.zip')
+    if os.path.exists(archive_path):
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                if filename in archive.namelist():
+                    return archive_path, filename
+        except (OSError, zipfile.BadZipFile):
+            return None
+
+    return None
+
 
-    return sorted(list(dates))
+def get_dates_for_kiosk(kiosk_id):
+    """Get available dates for a specific kiosk by scanning transaction files and archives"""
+    return sorted(get_transaction_sources(kiosk_id))
+
+
+@contextmanager
+def open_transaction_file(file_path, member=None):
+    """
+    Open a transaction source as a text stream, decompressing on the fly.
+    Handles plain .csv, .csv.gz, .csv.zst and CSV members of a monthly .zip archive.
+    """
+    if member is not None:
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open(member) as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8') as file:
+                    yield file
+    elif file_path.endswith('.gz'):
+        with gzip.open(file_path, 'rt', encoding='utf-8') as file:
+            yield file
+    elif file_path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed; cannot read .zst files")
+        with open(file_path, 'rb') as compressed:
+            with zstandard.ZstdDecompressor().stream_reader(compressed) as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8') as file:
+                    yield file
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield file
 
 
 # ============================================================================
 # CSV PROCESSING
 # ============================================================================
 
-def process_csv_file(file_path):
-    """Process a single CSV file and return aggregated data"""
+def _resolve_columns(header_line):
+    """
+    Map column names to positions from a CSV header line (last duplicate wins, as in DictReader).
+    Returns (positions, number of header fields).
+    """
+    header = next(csv.reader([header_line]), [])
+    return {name: index for index, name in enumerate(header)}, len(header)
+
+
+def _iter_csv_chunks(file, num_columns):
+    """
+    Yield (columns, rows) for each chunk of a CSV file, reading lines in large buffered blocks.
+    When every line of a chunk has exactly num_columns unquoted fields, the whole chunk is split in
+    one call and returned column-wise (columns[i] holds field i of every row, rows is None); this
+    avoids allocating a list per row. Other chunks are parsed with the csv module and returned
+    row-wise (columns is None), without blank lines, which DictReader also skips.
+    """
+    while True:
+        lines = file.readlines(CSV_READ_BUFFER_SIZE)
+        if not lines:
+            return
+        text = ''.join(lines)
+        if num_columns > 1 and '"' not in text and set(map(str.count, lines, repeat(','))) == {num_columns - 1}:
+            fields = text.replace('\n', ',').split(',')
+            end = num_columns * len(lines)
+            yield [fields[i:end:num_columns] for i in range(num_columns)], None
+        else:
+            yield None, [row for row in csv.reader(lines) if row]
+
+
+def _column(columns, rows, index, default):
+    """Iterate one column of a chunk from _iter_csv_chunks, or a constant default if the column is absent"""
+    if index is None:
+        return repeat(default, len(rows) if rows is not None else len(columns[0]))
+    if columns is not None:
+        return columns[index]
+    return map(itemgetter(index), rows)
+
+
+def _summarize_rows(user_volumes, user_access_count, pass_count, fail_count, individual_volumes):
+    """Build the per-file summary returned by process_csv_file"""
+    total_transactions = pass_count + fail_count
+    if total_transactions == 0:
+        return None
+
+    success_rate = (pass_count / total_transactions * 100) if total_transactions > 0 else 0
+    total_volume = sum(user_volumes.values())
+
+    return {
+        'user_volumes': dict(user_volumes),
+        'user_access_count': dict(user_access_count),
+        'total_transactions': total_transactions,
+        'pass_count': pass_count,
+        'fail_count': fail_count,
+        'success_rate': round(success_rate, 2),
+        'total_volume': round(total_volume, 2),
+        'unique_users': len(user_volumes),
+        'individual_volumes': individual_volumes
+    }
+
+
+def process_csv_file_dictreader(file_path, member=None):
+    """Process a single CSV file with csv.DictReader and return aggregated data"""
     user_volumes = defaultdict(float)
     user_access_count = defaultdict(int)
-    total_transactions = 0
     pass_count = 0
     fail_count = 0
     individual_volumes = []
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
+        with open_transaction_file(file_path, member) as file:
             reader = csv.DictReader(file)
             for row in reader:
                 try:
@@ -90,7 +302,6 @@ def process_csv_file(file_path):
                     if user_id and volume >= 0:
                         user_volumes[user_id] += volume
                         user_access_count[user_id] += 1
-                        total_transactions += 1
                         individual_volumes.append(volume)
 
                         if response == 'PASS':
@@ -105,66 +316,194 @@ def process_csv_file(file_path):
         print(f"Error processing {file_path}: {str(e)}")
         return None
 
-    if total_transactions == 0:
+    return _summarize_rows(user_volumes, user_access_count, pass_count, fail_count, individual_volumes)
+
+
+def _aggregate_rows(rows, width, user_index, volume_index, response_index):
+    """Filter a chunk row by row with DictReader skip rules; returns (users, volumes, pass count)"""
+    users = []
+    volumes = []
+    passed = 0
+    for fields in rows:
+        if len(fields) < width:
+            continue
+
+        user_id = fields[user_index].strip()
+        if not user_id:
+            continue
+
+        try:
+            volume = float(fields[volume_index]) if volume_index is not None else 0.0
+        except ValueError:
+            continue
+        if not volume >= 0:
+            continue
+
+        users.append(user_id)
+        volumes.append(volume)
+        if response_index is not None and fields[response_index].strip().upper() == 'PASS':
+            passed += 1
+    return users, volumes, passed
+
+
+def process_csv_file_fast(file_path, member=None):
+    """
+    Process a single CSV file with the positional parser and return aggregated data.
+    Column positions are resolved once from the header; rows that are too short or
+    have an unparseable volume are skipped, like the DictReader path.
+    """
+    user_volumes = defaultdict(float)
+    user_access_count = Counter()
+    pass_count = 0
+    fail_count = 0
+    individual_volumes = []
+
+    try:
+        with open_transaction_file(file_path, member) as file:
+            positions, num_columns = _resolve_columns(file.readline())
+            user_index = positions.get('User_ID')
+            volume_index = positions.get('Volume_ML')
+            response_index = positions.get('Response')
+
+            if user_index is not None:
+                width = max(i for i in (user_index, volume_index, response_index) if i is not None) + 1
+
+                for columns, rows in _iter_csv_chunks(file, num_columns):
+                    # Whole-chunk conversion with C-level map/Counter; any chunk holding a row the
+                    # DictReader path would skip (short, blank user, bad or negative volume) is
+                    # aggregated row by row instead
+                    try:
+                        users = list(map(str.strip, _column(columns, rows, user_index, '')))
+                        volumes = list(map(float, _column(columns, rows, volume_index, 0.0)))
+                        responses = list(map(str.upper, map(str.strip, _column(columns, rows, response_index, ''))))
+                        clean = '' not in users and min(volumes, default=0) >= 0 and not math.isnan(sum(volumes))
+                    except (IndexError, ValueError):
+                        clean = False
+
+                    if clean:
+                        passed = responses.count('PASS')
+                    else:
+                        rows = rows if rows is not None else list(zip(*columns))
+                        users, volumes, passed = _aggregate_rows(rows, width, user_index, volume_index, response_index)
+
+                    for user_id, volume in zip(users, volumes):
+                        user_volumes[user_id] += volume
+                    user_access_count.update(users)
+                    individual_volumes.extend(volumes)
+                    pass_count += passed
+                    fail_count += len(users) - passed
+    except Exception as e:
+        print(f"Error processing {file_path}: {str(e)}")
         return None
 
-    success_rate = (pass_count / total_transactions * 100) if total_transactions > 0 else 0
-    total_volume = sum(user_volumes.values())
+    return _summarize_rows(user_volumes, user_access_count, pass_count, fail_count, individual_volumes)
 
-    return {
-        'user_volumes': dict(user_volumes),
-        'user_access_count': dict(user_access_count),
-        'total_transactions': total_transactions,
-        'pass_count': pass_count,
-        'fail_count': fail_count,
-        'success_rate': round(success_rate, 2),
-        'total_volume': round(total_volume, 2),
-        'unique_users': len(user_volumes),
-        'individual_volumes': individual_volumes
-    }
 
+def process_csv_file(file_path, member=None):
+    """Process a single CSV file (or archive member) and return aggregated data using the configured parser"""
+    if CSV_PARSER == 'dictreader':
+        return process_csv_file_dictreader(file_path, member)
+    return process_csv_file_fast(file_path, member)
 
-def load_transaction_file(kiosk_id, date):
-    """Load raw transaction data from a specific file"""
-    kiosk_dir = os.path.join(TRANSACTIONS_DIRECTORY, f'kiosk_{kiosk_id}')
 
-    # Convert date format YYYY-MM-DD to MMDDYY for filename
-    try:
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
-        date_file_str = date_obj.strftime('%m%d%y')
-    except:
-        return None
+def read_transactions(source):
+    """
+    Read raw transaction rows from a source (file_path, member) with csv.DictReader.
+    The positional parser is only used for aggregation: building one dict per row dominates
+    here, so it measured about 1.5x faster, too little to justify a second parser.
+    """
+    transactions = []
+    with open_transaction_file(*source) as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            transactions.append({
+                'time': row.get('Timestamp', '').strip(),
+                'client': row.get('Client_Name', '').strip(),
+                'user_id': row.get('User_ID', '').strip(),
+                'volume_ml': int(row.get('Volume_ML', 0)),
+                'response': row.get('Response', '').strip()
+            })
+    return transactions
 
-    filename = f'transactions_{kiosk_id}_{date_file_str}.csv'
-    file_path = os.path.join(kiosk_dir, filename)
 
-    if not os.path.exists(file_path):
+def load_transaction_file(kiosk_id, date):
+    """Load raw transaction data from a specific file"""
+    source = find_transaction_source(kiosk_id, date)
+    if source is None:
         return None
 
-    transactions = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                transactions.append({
-                    'time': row.get('Timestamp', '').strip(),
-                    'client': row.get('Client_Name', '').strip(),
-                    'user_id': row.get('User_ID', '').strip(),
-                    'volume_ml': int(row.get('Volume_ML', 0)),
-                    'response': row.get('Response', '').strip()
-                })
+        return read_transactions(source)
     except:
         return None
 
-    return transactions
-
 
 # ============================================================================
 # DATA AGGREGATION
 # ============================================================================
 
-def aggregate_all_kiosks_daily():
-    """Aggregate daily data from all kiosks"""
+def _bucket_start(date_obj, resolution):
+    """First date (YYYY-MM-DD) of the day/week/month bucket containing a date; weeks start on Monday"""
+    if resolution == 'week':
+        return (date_obj - timedelta(days=date_obj.weekday())).strftime('%Y-%m-%d')
+    if resolution == 'month':
+        return date_obj.strftime('%Y-%m-01')
+    return date_obj.strftime('%Y-%m-%d')
+
+
+def choose_resolution(dates, max_points):
+    """Finest resolution whose bucket count fits within max_points (coarsest if none fits)"""
+    for resolution in TIME_SERIES_RESOLUTIONS:
+        buckets = {_bucket_start(datetime.strptime(d, '%Y-%m-%d'), resolution) for d in dates}
+        if max_points is None or len(buckets) <= max_points:
+            return resolution
+    return TIME_SERIES_RESOLUTIONS[-1]
+
+
+def downsample_lttb(series, max_points, field):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a date-ordered series of dicts.
+    Keeps the first and last points and, from each bucket in between, the point forming the
+    largest triangle with the previously kept point and the next bucket's average, which
+    preserves peaks and dips of `field` far better than taking every Nth point.
+    """
+    n = len(series)
+    if max_points >= n or max_points < MIN_MAX_POINTS:
+        return series
+
+    xs = [datetime.strptime(p['date'], '%Y-%m-%d').toordinal() for p in series]
+    ys = [p[field] for p in series]
+    bucket_size = (n - 2) / (max_points - 2)
+
+    sampled = [series[0]]
+    previous = 0
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+
+        next_xs = xs[end:next_end] or [xs[-1]]
+        next_ys = ys[end:next_end] or [ys[-1]]
+        avg_x = sum(next_xs) / len(next_xs)
+        avg_y = sum(next_ys) / len(next_ys)
+
+        px, py = xs[previous], ys[previous]
+        best = max(range(start, end),
+                   key=lambda j: abs((px - avg_x) * (ys[j] - py) - (px - xs[j]) * (avg_y - py)))
+        sampled.append(series[best])
+        previous = best
+
+    sampled.append(series[-1])
+    return sampled
+
+
+def aggregate_all_kiosks_daily(resolution='day', max_points=None):
+    """
+    Aggregate daily data from all kiosks.
+    resolution ('day', 'week', 'month' or 'auto') buckets the series; with max_points, 'auto' picks the
+    finest resolution that fits and any series still longer is reduced with LTTB on total volume.
+    Returns (series, weekday_data, resolution used).
+    """
     daily_data = defaultdict(lambda: {
         'total_volume_ml': 0,
         'total_transactions': 0,
@@ -177,47 +516,77 @@ def aggregate_all_kiosks_daily():
     day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     weekday_data = defaultdict(lambda: {
         'total_volume_ml': 0,
-        'total_transactions': 0
+        'total_transactions': 0,
+        'dates': set()
     })
 
     for kiosk_id in kiosks:
-        dates = get_dates_for_kiosk(kiosk_id)
+        sources = get_transaction_sources(kiosk_id)
 
-        for date in dates:
-            kiosk_dir = os.path.join(TRANSACTIONS_DIRECTORY, f'kiosk_{kiosk_id}')
+        for date in sorted(sources):
             date_obj = datetime.strptime(date, '%Y-%m-%d')
-            date_file_str = date_obj.strftime('%m%d%y')
-            filename = f'transactions_{kiosk_id}_{date_file_str}.csv'
-            file_path = os.path.join(kiosk_dir, filename)
-
-            if os.path.exists(file_path):
-                data = process_csv_file(file_path)
-                if data:
-                    daily_data[date]['total_volume_ml'] += data['total_volume']
-                    daily_data[date]['total_transactions'] += data['total_transactions']
-                    daily_data[date]['total_users'].update(data['user_volumes'].keys())
-                    daily_data[date]['pass_count'] += data['pass_count']
-                    daily_data[date]['fail_count'] += data['fail_count']
-
-                    # Aggregate by day of week
-                    day_name = day_names[date_obj.weekday()]
-                    weekday_data[day_name]['total_volume_ml'] += data['total_volume']
-                    weekday_data[day_name]['total_transactions'] += data['total_transactions']
+            data = process_csv_file(*sources[date])
+            if data:
+                daily_data[date]['total_volume_ml'] += data['total_volume']
+                daily_data[date]['total_transactions'] += data['total_transactions']
+                daily_data[date]['total_users'].update(data['user_volumes'].keys())
+                daily_data[date]['pass_count'] += data['pass_count']
+                daily_data[date]['fail_count'] += data['fail_count']
+
+                # Aggregate by day of week
+                day_name = day_names[date_obj.weekday()]
+                weekday_data[day_name]['total_volume_ml'] += data['total_volume']
+                weekday_data[day_name]['total_transactions'] += data['total_transactions']
+                weekday_data[day_name]['dates'].add(date)
+
+    if resolution == 'auto':
+        resolution = choose_resolution(daily_data.keys(), max_points)
+
+    # Roll days up into buckets (users are unioned, so a bucket counts each user once)
+    buckets = {}
+    for date in sorted(daily_data.keys()):
+        entry = daily_data[date]
+        key = _bucket_start(datetime.strptime(date, '%Y-%m-%d'), resolution)
+        if key not in buckets:
+            buckets[key] = {
+                'total_volume_ml': 0,
+                'total_transactions': 0,
+                'total_users': set(),
+                'pass_count': 0,
+                'fail_count': 0,
+                'end_date': date,
+                'days': 0
+            }
+        bucket = buckets[key]
+        bucket['total_volume_ml'] += entry['total_volume_ml']
+        bucket['total_transactions'] += entry['total_transactions']
+        bucket['total_users'].update(entry['total_users'])
+        bucket['pass_count'] += entry['pass_count']
+        bucket['fail_count'] += entry['fail_count']
+        bucket['end_date'] = date
+        bucket['days'] += 1
 
     # Convert sets to counts and sort by date
     sorted_daily = []
-    for date in sorted(daily_data.keys()):
-        entry = daily_data[date]
-        sorted_daily.append({
-            'date': date,
-            'total_volume_ml': round(entry['total_volume_ml'], 2),
-            'total_transactions': entry['total_transactions'],
-            'total_users': len(entry['total_users']),
-            'pass_count': entry['pass_count'],
-            'fail_count': entry['fail_count']
-        })
+    for key in sorted(buckets.keys()):
+        bucket = buckets[key]
+        point = {
+            'date': key,
+            'total_volume_ml': round(bucket['total_volume_ml'], 2),
+            'total_transactions': bucket['total_transactions'],
+            'total_users': len(bucket['total_users']),
+            'pass_count': bucket['pass_count'],
+            'fail_count': bucket['fail_count']
+        }
+        if resolution != 'day':
+            point['end_date'] = bucket['end_date']
+            point['days'] = bucket['days']
+        sorted_daily.append(point)
+
+    if max_points is not None and len(sorted_daily) > max_points:
+        sorted_daily = downsample_lttb(sorted_daily, max_points, 'total_volume_ml')
 
-    return sorted_daily, weekday_data
+    return sorted_daily, weekday_data, resolution
 
 
 def aggregate_kiosk_data(kiosk_id, period='all', date=None):
@@ -229,7 +598,7 @@ def aggregate_kiosk_data(kiosk_id, period='all', date=None):
 
     if period == 'all':
         # Aggregate all days for this kiosk
-        dates = get_dates_for_kiosk(kiosk_id)
+        sources = get_transaction_sources(kiosk_id)
         daily_data = []
         summary = {
             'total_volume_ml': 0,
@@ -239,32 +608,26 @@ def aggregate_kiosk_data(kiosk_id, period='all', date=None):
             'total_fail': 0
         }
 
-        for date in dates:
-            date_obj = datetime.strptime(date, '%Y-%m-%d')
-            date_file_str = date_obj.strftime('%m%d%y')
-            filename = f'transactions_{kiosk_id}_{date_file_str}.csv'
-            file_path = os.path.join(kiosk_dir, filename)
-
-            if os.path.exists(file_path):
-                data = process_csv_file(file_path)
-                if data:
-                    daily_data.append({
-                        'date': date,
-                        'volume_ml': round(data['total_volume'], 2),
-                        'transactions': data['total_transactions'],
-                        'users': len(data['user_volumes']),
-                        'pass_count': data['pass_count'],
-                        'fail_count': data['fail_count'],
-                        'user_volumes': data['user_volumes'],
-                        'user_access_count': data['user_access_count'],
-                        'individual_volumes': data['individual_volumes']
-                    })
-
-                    summary['total_volume_ml'] += data['total_volume']
-                    summary['total_transactions'] += data['total_transactions']
-                    summary['unique_users'].update(data['user_volumes'].keys())
-                    summary['total_pass'] += data['pass_count']
-                    summary['total_fail'] += data['fail_count']
+        for date in sorted(sources):
+            data = process_csv_file(*sources[date])
+            if data:
+                daily_data.append({
+                    'date': date,
+                    'volume_ml': round(data['total_volume'], 2),
+                    'transactions': data['total_transactions'],
+                    'users': len(data['user_volumes']),
+                    'pass_count': data['pass_count'],
+                    'fail_count': data['fail_count'],
+                    'user_volumes': data['user_volumes'],
+                    'user_access_count': data['user_access_count'],
+                    'individual_volumes': data['individual_volumes']
+                })
+
+                summary['total_volume_ml'] += data['total_volume']
+                summary['total_transactions'] += data['total_transactions']
+                summary['unique_users'].update(data['user_volumes'].keys())
+                summary['total_pass'] += data['pass_count']
+                summary['total_fail'] += data['fail_count']
 
         # Calculate averages based on number of days
         num_days = len(daily_data)
@@ -316,6 +679,345 @@ def aggregate_kiosk_data(kiosk_id, period='all', date=None):
     return None
 
 
+# ============================================================================
+# RELIABILITY MONITORING
+# ============================================================================
+
+class FailureRateBaseline:
+    """Exponentially weighted mean and variance of a daily failure rate (constant memory)"""
+
+    __slots__ = ('mean', 'variance', 'days')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.variance = 0.0
+        self.days = 0
+
+    def update(self, failure_rate):
+        """Fold one day's failure rate into the baseline"""
+        if self.days == 0:
+            self.mean = failure_rate
+        else:
+            diff = failure_rate - self.mean
+            increment = RELIABILITY_EWMA_ALPHA * diff
+            self.mean += increment
+            self.variance = (1 - RELIABILITY_EWMA_ALPHA) * (self.variance + diff * increment)
+        self.days += 1
+
+    def to_state(self):
+        return [self.mean, self.variance, self.days]
+
+    @classmethod
+    def from_state(cls, state):
+        baseline = cls()
+        baseline.mean, baseline.variance, baseline.days = state
+        return baseline
+
+    def z_score(self, fail_count, total, min_transactions):
+        """
+        How many standard deviations a failure rate sits above the baseline, or None if
+        there is not enough history or volume. The larger of the day-to-day variance and
+        the sampling variance for `total` transactions is used, so small samples need a
+        larger departure.
+        """
+        if self.days < RELIABILITY_MIN_BASELINE_DAYS or total < min_transactions:
+            return None
+        p = self.mean
+        std = max(math.sqrt(max(self.variance, p * (1 - p) / total)), RELIABILITY_RATE_FLOOR)
+        return (fail_count / total - p) / std
+
+
+def _minute_of_day(timestamp):
+    """Extract minute of day from 'HH:MM:SS' or 'YYYY-MM-DD HH:MM:SS', or None"""
+    time_part = timestamp[-8:]
+    if len(time_part) != 8 or time_part[2] != ':' or time_part[5] != ':':
+        return None
+    try:
+        return int(time_part[:2]) * 60 + int(time_part[3:5])
+    except ValueError:
+        return None
+
+
+def _rate_entry(fail_count, total, baseline, z_score):
+    """Format failure-rate figures for API responses"""
+    return {
+        'transactions': total,
+        'fail_count': fail_count,
+        'failure_rate': round(fail_count / total * 100, 2) if total else 0,
+        'baseline_failure_rate': round(baseline.mean * 100, 2) if baseline.days else None,
+        'baseline_days': baseline.days,
+        'z_score': round(z_score, 2) if z_score is not None else None
+    }
+
+
+class KioskReliability:
+    """Per-kiosk detector state: kiosk and client baselines plus the latest day's evaluation"""
+
+    __slots__ = ('baseline', 'client_baselines', 'committed_through', 'provisional', 'latest')
+
+    def __init__(self):
+        self.baseline = FailureRateBaseline()
+        self.client_baselines = defaultdict(FailureRateBaseline)
+        self.committed_through = None  # Last date folded into the baselines
+        self.provisional = None  # (date, file signature) of the newest day, evaluated but not committed
+        self.latest = None  # Evaluation of the newest day seen
+
+    def evaluate_day(self, date, transactions):
+        """
+        Score one day of transactions against the current baselines.
+        Returns (evaluation, kiosk counts, per-client counts) without changing the baselines.
+        """
+        total = 0
+        fail_count = 0
+        client_counts = defaultdict(lambda: [0, 0])  # client -> [fail_count, total]
+
+        # Rolling window of per-minute [minute, fail_count, total] buckets (at most RELIABILITY_WINDOW_MINUTES)
+        window = deque()
+        window_fail = 0
+        window_total = 0
+        peak_window = None
+
+        for t in transactions:
+            failed = t['response'].upper() != 'PASS'
+            total += 1
+            fail_count += failed
+            counts = client_counts[t['client']]
+            counts[0] += failed
+            counts[1] += 1
+
+            minute = _minute_of_day(t['time'])
+            if minute is None:
+                continue
+            if window and window[-1][0] == minute:
+                window[-1][1] += failed
+                window[-1][2] += 1
+            else:
+                window.append([minute, int(failed), 1])
+            window_fail += failed
+            window_total += 1
+            while window[0][0] <= minute - RELIABILITY_WINDOW_MINUTES:
+                _, evicted_fail, evicted_total = window.popleft()
+                window_fail -= evicted_fail
+                window_total -= evicted_total
+
+            if window_fail < RELIABILITY_MIN_WINDOW_FAILURES:
+                continue
+            z_score = self.baseline.z_score(window_fail, window_total, RELIABILITY_MIN_WINDOW_TRANSACTIONS)
+            if z_score is not None and (peak_window is None or z_score > peak_window['z_score']):
+                peak_window = {
+                    'start': f"{window[0][0] // 60:02d}:{window[0][0] % 60:02d}",
+                    'end': f"{minute // 60:02d}:{minute % 60:02d}",
+                    'fail_count': window_fail,
+                    'transactions': window_total,
+                    'z_score': z_score
+                }
+
+        evaluation = {
+            'date': date,
+            'kiosk': _rate_entry(fail_count, total, self.baseline,
+                                 self.baseline.z_score(fail_count, total, RELIABILITY_MIN_TRANSACTIONS)),
+            'clients': {
+                client: _rate_entry(c_fail, c_total, self.client_baselines[client],
+                                    self.client_baselines[client].z_score(c_fail, c_total, RELIABILITY_MIN_TRANSACTIONS))
+                for client, (c_fail, c_total) in sorted(client_counts.items())
+            },
+            'peak_window': None
+        }
+        if peak_window:
+            entry = _rate_entry(peak_window['fail_count'], peak_window['transactions'], self.baseline, peak_window['z_score'])
+            entry.update(start=peak_window['start'], end=peak_window['end'])
+            evaluation['peak_window'] = entry
+
+        return evaluation, (fail_count, total), client_counts
+
+    def commit_day(self, date, transactions):
+        """Evaluate a closed day, then fold it into the kiosk and client baselines"""
+        evaluation, (fail_count, total), client_counts = self.evaluate_day(date, transactions)
+        if total:
+            self.baseline.update(fail_count / total)
+        for client, (c_fail, c_total) in client_counts.items():
+            self.client_baselines[client].update(c_fail / c_total)
+        self.committed_through = date
+        self.latest = evaluation
+
+    def to_state(self):
+        """Baselines as JSON-serializable data (the provisional newest day is re-read after a restart)"""
+        return {
+            'committed_through': self.committed_through,
+            'baseline': self.baseline.to_state(),
+            'clients': {client: baseline.to_state() for client, baseline in self.client_baselines.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        kiosk = cls()
+        kiosk.committed_through = state['committed_through']
+        kiosk.baseline = FailureRateBaseline.from_state(state['baseline'])
+        for client, baseline_state in state['clients'].items():
+            kiosk.client_baselines[client] = FailureRateBaseline.from_state(baseline_state)
+        return kiosk
+
+    def alerts(self, kiosk_id):
+        """Alerts for the latest evaluated day"""
+        alerts = []
+        if self.latest is None:
+            return alerts
+
+        def add(alert_type, scope, entry, message):
+            z_score = entry['z_score']
+            if z_score is None or z_score < RELIABILITY_Z_THRESHOLD:
+                return
+            alerts.append({
+                'kiosk_id': kiosk_id,
+                'date': self.latest['date'],
+                'type': alert_type,
+                'scope': scope,
+                'severity': 'critical' if z_score >= 2 * RELIABILITY_Z_THRESHOLD else 'warning',
+                'message': message,
+                **entry
+            })
+
+        kiosk_entry = self.latest['kiosk']
+        add('daily_failure_rate', f'Kiosk {kiosk_id}', kiosk_entry,
+            f"Failure rate {kiosk_entry['failure_rate']}% vs baseline {kiosk_entry['baseline_failure_rate']}%")
+        for client, entry in self.latest['clients'].items():
+            add('client_failure_rate', client, entry,
+                f"{client} failure rate {entry['failure_rate']}% vs baseline {entry['baseline_failure_rate']}%")
+        window_entry = self.latest['peak_window']
+        if window_entry:
+            add('intraday_spike', f"{window_entry['start']}-{window_entry['end']}", window_entry,
+                f"{window_entry['fail_count']} of {window_entry['transactions']} transactions failed "
+                f"between {window_entry['start']} and {window_entry['end']}")
+        return alerts
+
+
+class ReliabilityMonitor:
+    """
+    Incremental failure-rate monitor across all kiosks, refreshed by a background thread.
+    Each refresh only looks at days newer than those already folded into the baselines;
+    the newest day per kiosk stays provisional (re-read when its file changes) until a later day arrives.
+    Baselines are saved to RELIABILITY_STATE_FILE so a restart resumes where the last run stopped.
+    """
+
+    def __init__(self):
+        self.kiosks = {}
+        self.last_refresh = None
+        self._lock = threading.Lock()  # Guards kiosks; held only while updating state, never during file reads
+        self._refresh_lock = threading.Lock()  # One refresh at a time
+        self._thread = None
+        self._state_loaded = False
+
+    def start(self):
+        """Start the background refresh thread (initial backfill, then every RELIABILITY_REFRESH_SECONDS)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='reliability-monitor', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing reliability monitor: {str(e)}")
+            time.sleep(RELIABILITY_REFRESH_SECONDS)
+
+    def _read_day(self, source):
+        """Read one day; a file that has vanished (e.g. just archived) is re-listed on the next refresh, not counted as empty"""
+        try:
+            return read_transactions(source)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"Error reading {source[0]} for reliability monitoring: {str(e)}")
+            return []
+
+    def _load_state(self):
+        """Restore baselines saved by a previous run, if any"""
+        try:
+            with open(RELIABILITY_STATE_FILE, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            kiosks = {kiosk_id: KioskReliability.from_state(state) for kiosk_id, state in saved['kiosks'].items()}
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading reliability state {RELIABILITY_STATE_FILE}, rebuilding: {str(e)}")
+            return
+        with self._lock:
+            self.kiosks.update(kiosks)
+
+    def _save_state(self):
+        with self._lock:
+            saved = {'kiosks': {kiosk_id: state.to_state() for kiosk_id, state in self.kiosks.items()}}
+        tmp_path = RELIABILITY_STATE_FILE + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, RELIABILITY_STATE_FILE)
+        except OSError as e:
+            print(f"Error saving reliability state {RELIABILITY_STATE_FILE}: {str(e)}")
+
+    def refresh(self):
+        """Ingest any transaction files that are new or changed since the last refresh"""
+        with self._refresh_lock:
+            if not self._state_loaded:
+                self._load_state()
+                self._state_loaded = True
+
+            committed = False
+            for kiosk_id in get_kiosk_directories():
+                with self._lock:
+                    state = self.kiosks.setdefault(kiosk_id, KioskReliability())
+                committed_through = state.committed_through
+                try:
+                    self._refresh_kiosk(state, kiosk_id)
+                except OSError as e:
+                    # Files can move while archive_transactions.py runs; retry this kiosk on the next refresh
+                    print(f"Error refreshing reliability for kiosk {kiosk_id}: {str(e)}")
+                committed = committed or state.committed_through != committed_through
+
+            if committed:
+                self._save_state()
+            self.last_refresh = datetime.now().isoformat(timespec='seconds')
+
+    def _refresh_kiosk(self, state, kiosk_id):
+        """Commit a kiosk's closed days newer than its baselines and re-evaluate its newest day if it changed"""
+        sources = get_transaction_sources(kiosk_id, since=state.committed_through)
+        new_dates = sorted(sources)
+        if not new_dates:
+            return
+
+        # Files are read outside the lock so /alerts requests never wait on disk
+        for date in new_dates[:-1]:
+            transactions = self._read_day(sources[date])
+            with self._lock:
+                state.commit_day(date, transactions)
+                state.provisional = None
+
+        newest = new_dates[-1]
+        file_stat = os.stat(sources[newest][0])
+        signature = (newest, sources[newest], file_stat.st_mtime, file_stat.st_size)
+        if state.provisional != signature:
+            evaluation, _, _ = state.evaluate_day(newest, self._read_day(sources[newest]))
+            with self._lock:
+                state.latest = evaluation
+                state.provisional = signature
+
+    def alerts(self, kiosk_id=None):
+        """Current alerts, most severe first"""
+        with self._lock:
+            alerts = []
+            for k_id, state in sorted(self.kiosks.items()):
+                if kiosk_id is None or k_id == kiosk_id:
+                    alerts.extend(state.alerts(k_id))
+        alerts.sort(key=lambda a: a['z_score'], reverse=True)
+        return alerts
+
+
+reliability_monitor = ReliabilityMonitor()
+
+
 # ============================================================================
 # FLASK ROUTES
 # ============================================================================
@@ -342,8 +1044,24 @@ def get_kiosk_dates(kiosk_id):
 
 @app.route('/api/analytics/aggregated', methods=['GET'])
 def get_aggregated():
-    """Get aggregated data for all kiosks"""
-    daily_data, weekday_data = aggregate_all_kiosks_daily()
+    """
+    Get aggregated data for all kiosks.
+    Optional ?resolution=day|week|month|auto and ?max_points=N cap the size of the time series.
+    """
+    resolution = request.args.get('resolution', 'day')
+    if resolution not in TIME_SERIES_RESOLUTIONS + ['auto']:
+        return jsonify({'error': f'Invalid resolution: {resolution}'}), 400
+
+    max_points = request.args.get('max_points')
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if max_points < MIN_MAX_POINTS:
+            return jsonify({'error': f'max_points must be an integer >= {MIN_MAX_POINTS}'}), 400
+
+    daily_data, weekday_data, resolution = aggregate_all_kiosks_daily(resolution, max_points)
 
     day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 
@@ -354,11 +1072,12 @@ def get_aggregated():
             weekday_result[day_name] = {
                 'total_volume_ml': round(weekday_data[day_name]['total_volume_ml'], 2),
                 'total_transactions': weekday_data[day_name]['total_transactions'],
-                'days_included': sum(1 for d in daily_data if datetime.strptime(d['date'], '%Y-%m-%d').strftime('%A') == day_name)
+                'days_included': len(weekday_data[day_name]['dates'])
             }
 
     return jsonify({
         'daily': daily_data,
+        'resolution': resolution,
         'by_day_of_week': weekday_result
     })
 
@@ -381,6 +1100,21 @@ def get_kiosk_data(kiosk_id):
     return jsonify(result)
 
 
+@app.route('/api/analytics/alerts', methods=['GET'])
+def get_alerts():
+    """Get reliability alerts for kiosks whose failure rate departs from their own baseline"""
+    kiosk_id = request.args.get('kiosk_id')
+    reliability_monitor.start()  # No-op once running; covers servers that import the app without __main__
+    alerts = reliability_monitor.alerts(kiosk_id)
+
+    return jsonify({
+        'alerts': alerts,
+        'total_alerts': len(alerts),
+        'kiosks_monitored': len(reliability_monitor.kiosks),
+        'last_refresh': reliability_monitor.last_refresh  # None until the initial backfill has finished
+    })
+
+
 @app.route('/api/analytics/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -395,13 +1129,15 @@ def health():
 if __name__ == '__main__':
     print("🚀 Starting Analytics API...")
     print(f"📁 Transactions Directory: {TRANSACTIONS_DIRECTORY}")
-    print(f"🌐 API will be available at: http://localhost:8082")
+    print(f"🌐 API will be available at: http://localhost:{PORT}")
     print(f"📊 Available endpoints:")
     print(f"   - GET /api/analytics/kiosks")
     print(f"   - GET /api/analytics/kiosk/<kiosk_id>/dates")
-    print(f"   - GET /api/analytics/aggregated")
+    print(f"   - GET /api/analytics/aggregated?resolution=auto&max_points=N")
     print(f"   - GET /api/analytics/kiosk/<kiosk_id>?date=all")
     print(f"   - GET /api/analytics/kiosk/<kiosk_id>?date=YYYY-MM-DD")
+    print(f"   - GET /api/analytics/alerts")
     print(f"   - GET /api/analytics/health")
 
-    app.run(host='0.0.0.0', port=8082, debug=False)
+    reliability_monitor.start()
+    app.run(host='0.0.0.0', port=PORT, debug=False)
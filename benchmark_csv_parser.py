@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the transaction CSV parsers in analytics_api.py
+Compares the positional fast parser against the csv.DictReader parser on a synthetic transaction file
+"""
+
+import gc
+import os
+import sys
+import random
+import statistics
+import tempfile
+import time
+
+import analytics_api
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+NUM_ROWS = 200000  # Rows in the synthetic transaction file
+NUM_USERS = 100  # Distinct users in the synthetic file
+NUM_RUNS = 10  # Timed runs per parser; parsers alternate each run and the median is reported
+TARGET_SPEEDUP = 3.0  # Goal for fast parser rows/sec vs DictReader
+
+
+def write_synthetic_file(file_path, num_rows, num_users):
+    """Write a transaction CSV file in the generate_transactions.py schema"""
+    users = [("708" + str(random.randint(100000, 999999)), str(random.randint(1000, 9999))) for _ in range(num_users)]
+    with open(file_path, 'w', newline='') as f:
+        f.write('Timestamp,Client_Name,User_ID,PIN,Volume_ML,Response\r\n')
+        for i in range(num_rows):
+            user_id, pin = random.choice(users)
+            seconds = 6 * 3600 + (i * 43200) // num_rows
+            timestamp = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            response = "PASS" if random.random() < 0.98 else "FAIL"
+            f.write(f"{timestamp},Client {random.randint(1, 6)},{user_id},{pin},{random.randint(100, 600)},{response}\r\n")
+
+
+def time_call(parser, call):
+    """Run call() with analytics_api.CSV_PARSER set to parser; return (elapsed seconds, result)"""
+    analytics_api.CSV_PARSER = parser
+    gc.collect()
+    start = time.perf_counter()
+    result = call()
+    return time.perf_counter() - start, result
+
+
+def benchmark(name, call, num_rows, runs):
+    """Time both parsers on a call, alternating their order each run; returns the median speedup"""
+    timings = {'dictreader': [], 'fast': []}
+    results = {}
+    for run in range(runs):
+        order = ['dictreader', 'fast'] if run % 2 == 0 else ['fast', 'dictreader']
+        for parser in order:
+            elapsed, results[parser] = time_call(parser, call)
+            timings[parser].append(elapsed)
+
+    print(f"\n⏱️  {name}")
+    for parser, values in timings.items():
+        median = statistics.median(values)
+        print(f"   {parser:<11} median {median * 1000:8.1f} ms  (min {min(values) * 1000:.1f})  "
+              f"{num_rows / median:12,.0f} rows/sec")
+
+    if results['fast'] != results['dictreader']:
+        print("❌ Parsers returned different results")
+        sys.exit(1)
+
+    speedup = statistics.median(timings['dictreader']) / statistics.median(timings['fast'])
+    status = "✅" if speedup >= TARGET_SPEEDUP else "⚠️"
+    print(f"{status} Fast parser speedup: {speedup:.2f}x (target {TARGET_SPEEDUP:.1f}x)")
+    return speedup
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_ROWS
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'transactions_0000_010125.csv')
+        write_synthetic_file(file_path, num_rows, NUM_USERS)
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"📄 Synthetic file: {num_rows} rows, {size_mb:.1f} MB, {NUM_RUNS} interleaved runs per parser")
+
+        benchmark('process_csv_file (aggregation)', lambda: analytics_api.process_csv_file(file_path), num_rows, NUM_RUNS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Load test for the Analytics API
+Starts analytics_api.py against a generated kiosk fleet, replays dashboard request mixes from
+concurrent asyncio clients and reports throughput, latency percentiles, errors and server CPU/RSS
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transactions'))
+import generate_kiosk_users
+import generate_transactions
+
+try:
+    import psutil  # Optional: used for server CPU/RSS when available, otherwise /proc is read
+except ImportError:
+    psutil = None
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_KIOSKS = 50  # Kiosks in the generated fleet
+DEFAULT_DAYS = 30  # Days of transactions per kiosk
+DEFAULT_CONCURRENCY = 10  # Simultaneous dashboard users
+DEFAULT_DURATION = 30  # Seconds per load level
+DEFAULT_SWEEP = [1, 2, 4, 8, 16, 32, 64]  # Concurrency levels for --sweep
+DEFAULT_SLO_P95_MS = 1000  # p95 latency a load level must stay under to count as capacity
+KNEE_LATENCY_RISE = 1.5  # Mean latency growth past the best level that shows the server has saturated
+THINK_TIME = (0.5, 2.0)  # Seconds a user pauses between dashboard actions (min, max)
+REQUEST_TIMEOUT = 30  # Seconds before a request counts as an error
+SAMPLE_INTERVAL = 1.0  # Seconds between throughput/CPU/RSS samples
+SERVER_PORT = 18082  # Port for the locally started API
+SERVER_STARTUP_TIMEOUT = 30  # Seconds to wait for /api/analytics/health
+WARMUP_TIMEOUT = 300  # Seconds to wait for the server's reliability backfill before the first level
+
+# Dashboard actions and their share of sessions (only endpoints dashboard.html actually calls)
+SCENARIO_WEIGHTS = {
+    'tab_open': 0.2,  # Analytics tab: kiosk list, daily trends
+    'kiosk_switch': 0.5,  # Pick a kiosk: its dates, then all-days data
+    'date_drilldown': 0.3  # Pick a date for the current kiosk
+}
+
+
+# ============================================================================
+# FLEET GENERATION
+# ============================================================================
+
+def generate_fleet(output_dir, num_kiosks, num_days):
+    """Generate kiosk user databases and transaction files using the transactions/ scripts"""
+    generate_transactions.NUM_DAYS = num_days
+    kiosk_ids = generate_kiosk_users.generate_random_kiosk_ids(num_kiosks)
+
+    for kiosk_id in kiosk_ids:
+        kiosk_dir = os.path.join(output_dir, f"kiosk_{kiosk_id:04d}")
+        num_users = random.randint(generate_kiosk_users.MIN_USERS_PER_KIOSK, generate_kiosk_users.MAX_USERS_PER_KIOSK)
+        generate_kiosk_users.generate_kiosk_users(kiosk_id, num_users, random.randint(4, 6), kiosk_dir)
+
+        kiosk_id_str, num_clients = generate_transactions.load_kiosk_metadata(kiosk_dir)
+        users = generate_transactions.load_kiosk_users(kiosk_dir)
+        generate_transactions.generate_kiosk_transactions(kiosk_id_str, users, num_clients, kiosk_dir)
+
+
+# ============================================================================
+# SERVER PROCESS
+# ============================================================================
+
+def start_server(transactions_dir, port):
+    """Start analytics_api.py as a subprocess serving the given transactions directory"""
+    env = dict(os.environ, ANALYTICS_TRANSACTIONS_DIR=transactions_dir, ANALYTICS_PORT=str(port))
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_api.py')
+    return subprocess.Popen([sys.executable, script], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_for_server(base_url, process):
+    """Poll the health endpoint until the server answers"""
+    deadline = time.monotonic() + SERVER_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"analytics_api.py exited with code {process.returncode}")
+        try:
+            status, _ = await http_get(base_url, '/api/analytics/health')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {SERVER_STARTUP_TIMEOUT}s")
+
+
+class ProcessSampler:
+    """Reads CPU time and RSS of the server process (psutil if installed, else Linux /proc)"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.process = psutil.Process(pid) if psutil else None
+        self.last_cpu = None
+        self.last_time = None
+
+    def _read(self):
+        if self.process is not None:
+            cpu = self.process.cpu_times()
+            return cpu.user + cpu.system, self.process.memory_info().rss
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{self.pid}/statm') as f:
+            rss_pages = int(f.read().split()[1])
+        ticks = os.sysconf('SC_CLK_TCK')
+        return (int(fields[11]) + int(fields[12])) / ticks, rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+    def sample(self):
+        """Return (cpu percent since last sample, rss MB), or (None, None) if unavailable"""
+        try:
+            cpu_seconds, rss = self._read()
+        except (OSError, IndexError, ValueError) + ((psutil.Error,) if psutil else ()):
+            return None, None
+        now = time.monotonic()
+        cpu_percent = None
+        if self.last_cpu is not None and now > self.last_time:
+            cpu_percent = (cpu_seconds - self.last_cpu) / (now - self.last_time) * 100
+        self.last_cpu, self.last_time = cpu_seconds, now
+        return cpu_percent, rss / (1024 * 1024)
+
+
+# ============================================================================
+# HTTP CLIENT
+# ============================================================================
+
+async def http_get(base_url, path):
+    """Minimal HTTP/1.1 GET over asyncio streams; returns (status, body bytes)"""
+    url = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1]) if head.startswith(b'HTTP/') else 0
+    return status, body
+
+
+class Stats:
+    """Latencies and errors for one load level, plus a per-interval timeline"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # endpoint -> [seconds]
+        self.errors = defaultdict(int)  # endpoint -> count
+        self.interval_completed = 0
+        self.interval_errors = 0
+        self.timeline = []
+
+    def record(self, endpoint, latency, ok):
+        self.latencies[endpoint].append(latency)
+        self.interval_completed += 1
+        if not ok:
+            self.errors[endpoint] += 1
+            self.interval_errors += 1
+
+
+async def timed_get(base_url, path, endpoint, stats):
+    """GET a path and record its latency under an endpoint label; returns parsed JSON or None"""
+    start = time.perf_counter()
+    try:
+        status, body = await asyncio.wait_for(http_get(base_url, path), REQUEST_TIMEOUT)
+        ok = status == 200
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        status, body, ok = 0, b'', False
+    stats.record(endpoint, time.perf_counter() - start, ok)
+    if ok:
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+    return None
+
+
+# ============================================================================
+# DASHBOARD USER SIMULATION
+# ============================================================================
+
+async def dashboard_user(base_url, kiosk_ids, stats, deadline, think_time):
+    """One simulated dashboard user repeatedly performing weighted dashboard actions"""
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    kiosk_id = random.choice(kiosk_ids)
+    dates = []
+
+    while time.monotonic() < deadline:
+        scenario = random.choices(scenarios, weights)[0]
+
+        if scenario == 'tab_open':
+            await asyncio.gather(
+                timed_get(base_url, '/api/analytics/kiosks', 'kiosks', stats),
+                timed_get(base_url, '/api/analytics/aggregated?resolution=auto&max_points=120', 'aggregated', stats)
+            )
+        elif scenario == 'kiosk_switch' or not dates:
+            kiosk_id = random.choice(kiosk_ids)
+            result = await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}/dates', 'kiosk_dates', stats)
+            dates = result['dates'] if result else []
+            await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}?date=all', 'kiosk_all', stats)
+        else:
+            date = random.choice(dates)
+            await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}?date={date}', 'kiosk_day', stats)
+
+        await asyncio.sleep(min(random.uniform(*think_time), max(0, deadline - time.monotonic())))
+
+
+async def warm_up(base_url, kiosk_ids):
+    """
+    Call each dashboard endpoint once and wait for the server's background reliability backfill,
+    so one-off startup work is not counted in the first load level. Nothing here is recorded.
+    """
+    stats = Stats()
+    kiosk_id = kiosk_ids[0]
+    await timed_get(base_url, '/api/analytics/aggregated?resolution=auto&max_points=120', 'aggregated', stats)
+    result = await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}/dates', 'kiosk_dates', stats)
+    await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}?date=all', 'kiosk_all', stats)
+    if result and result['dates']:
+        await timed_get(base_url, f'/api/analytics/kiosk/{kiosk_id}?date={result["dates"][-1]}', 'kiosk_day', stats)
+
+    deadline = time.monotonic() + WARMUP_TIMEOUT
+    while time.monotonic() < deadline:
+        result = await timed_get(base_url, '/api/analytics/alerts', 'alerts', stats)
+        if result is None or result.get('last_refresh') is not None:
+            return
+        await asyncio.sleep(SAMPLE_INTERVAL)
+    print(f"⚠️  Reliability backfill still running after {WARMUP_TIMEOUT}s; results may include it")
+
+
+async def sample_timeline(stats, sampler, start, deadline):
+    """Record throughput, errors and server CPU/RSS every SAMPLE_INTERVAL seconds"""
+    if sampler:
+        sampler.sample()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        cpu_percent, rss_mb = sampler.sample() if sampler else (None, None)
+        stats.timeline.append({
+            'elapsed': round(time.monotonic() - start, 1),
+            'requests_per_sec': round(stats.interval_completed / SAMPLE_INTERVAL, 1),
+            'errors': stats.interval_errors,
+            'cpu_percent': round(cpu_percent, 1) if cpu_percent is not None else None,
+            'rss_mb': round(rss_mb, 1) if rss_mb is not None else None
+        })
+        stats.interval_completed = 0
+        stats.interval_errors = 0
+
+
+async def run_level(base_url, kiosk_ids, concurrency, duration, think_time, sampler):
+    """Run one load level and return its summary"""
+    stats = Stats()
+    start = time.monotonic()
+    deadline = start + duration
+    users = [dashboard_user(base_url, kiosk_ids, stats, deadline, think_time) for _ in range(concurrency)]
+    await asyncio.gather(sample_timeline(stats, sampler, start, deadline), *users)
+    return summarize(concurrency, time.monotonic() - start, stats)
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0,
+        'error_rate': round(errors / count * 100, 2) if count else 0,
+        'mean_ms': round(sum(latencies) / count * 1000, 1) if count else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1) if count else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1) if count else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1) if count else None
+    }
+
+
+def summarize(concurrency, elapsed, stats):
+    all_latencies = [lat for values in stats.latencies.values() for lat in values]
+    cpu = [s['cpu_percent'] for s in stats.timeline if s['cpu_percent'] is not None]
+    rss = [s['rss_mb'] for s in stats.timeline if s['rss_mb'] is not None]
+    summary = {
+        'concurrency': concurrency,
+        'duration_sec': round(elapsed, 1),
+        **latency_summary(all_latencies, sum(stats.errors.values()), elapsed),
+        'avg_cpu_percent': round(sum(cpu) / len(cpu), 1) if cpu else None,
+        'peak_rss_mb': max(rss) if rss else None,
+        'endpoints': {
+            endpoint: latency_summary(values, stats.errors[endpoint], elapsed)
+            for endpoint, values in sorted(stats.latencies.items())
+        },
+        'timeline': stats.timeline
+    }
+    return summary
+
+
+def find_knee(levels):
+    """
+    Knee of the throughput/latency curve: the level with the highest power
+    (throughput divided by mean latency), beyond which extra users mostly add queueing.
+    Returns None unless a higher level confirms saturation, i.e. its mean latency rose by
+    KNEE_LATENCY_RISE or it had 1% errors; otherwise the knee lies beyond the levels tested.
+    """
+    levels = sorted(levels, key=lambda lvl: lvl['concurrency'])
+    candidates = [lvl for lvl in levels if lvl['mean_ms'] and lvl['error_rate'] < 1]
+    if not candidates:
+        return None
+    best = max(candidates, key=lambda lvl: lvl['throughput_rps'] / lvl['mean_ms'])
+    for lvl in levels:
+        if lvl['concurrency'] <= best['concurrency']:
+            continue
+        if lvl['error_rate'] >= 1 or (lvl['mean_ms'] and lvl['mean_ms'] >= KNEE_LATENCY_RISE * best['mean_ms']):
+            return best['concurrency']
+    return None
+
+
+def format_ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def print_level(summary, show_timeline):
+    print(f"\n👥 {summary['concurrency']} concurrent users, {summary['duration_sec']}s")
+    print(f"   {'endpoint':<12} {'requests':>8} {'req/s':>8} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(summary['endpoints'].items()) + [('TOTAL', summary)]
+    for endpoint, s in rows:
+        print(f"   {endpoint:<12} {s['requests']:>8} {s['throughput_rps']:>8.1f} {s['error_rate']:>6.2f} "
+              f"{format_ms(s['p50_ms']):>8} {format_ms(s['p95_ms']):>8} {format_ms(s['p99_ms']):>8}")
+    print(f"   Server CPU avg: {format_ms(summary['avg_cpu_percent'])}%   Peak RSS: {format_ms(summary['peak_rss_mb'])} MB")
+
+    if show_timeline:
+        print(f"   {'t (s)':>7} {'req/s':>8} {'errors':>7} {'cpu %':>7} {'rss MB':>8}")
+        for s in summary['timeline']:
+            print(f"   {s['elapsed']:>7.1f} {s['requests_per_sec']:>8.1f} {s['errors']:>7} "
+                  f"{format_ms(s['cpu_percent']):>7} {format_ms(s['rss_mb']):>8}")
+
+
+def print_sweep(levels, slo_p95_ms):
+    print(f"\n📈 Saturation sweep")
+    print(f"   {'users':>6} {'req/s':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>6} {'cpu %':>7} {'rss MB':>8}")
+    for lvl in levels:
+        print(f"   {lvl['concurrency']:>6} {lvl['throughput_rps']:>8.1f} {format_ms(lvl['mean_ms']):>8} {format_ms(lvl['p50_ms']):>8} "
+              f"{format_ms(lvl['p95_ms']):>8} {format_ms(lvl['p99_ms']):>8} {lvl['error_rate']:>6.2f} "
+              f"{format_ms(lvl['avg_cpu_percent']):>7} {format_ms(lvl['peak_rss_mb']):>8}")
+
+    knee = find_knee(levels)
+    capacity = capacity_under_slo(levels, slo_p95_ms)
+    if knee is not None:
+        print(f"\n   Knee of the curve: {knee} concurrent users")
+    else:
+        print(f"\n   Knee of the curve: not reached (latency did not rise by {KNEE_LATENCY_RISE}x past the best level);"
+              f" try a wider --sweep or --no-think")
+    print(f"   Capacity at p95 <= {slo_p95_ms} ms and < 1% errors: {capacity} concurrent users")
+
+
+def capacity_under_slo(levels, slo_p95_ms):
+    """Highest concurrency up to which every level met the p95 latency SLO with under 1% errors (0 if none did)"""
+    capacity = 0
+    for lvl in sorted(levels, key=lambda lvl: lvl['concurrency']):
+        if lvl['p95_ms'] is None or lvl['p95_ms'] > slo_p95_ms or lvl['error_rate'] >= 1:
+            break
+        capacity = lvl['concurrency']
+    return capacity
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+async def run(args, base_url, sampler):
+    result = await http_get(base_url, '/api/analytics/kiosks')
+    kiosk_ids = [k['id'] for k in json.loads(result[1])['kiosks']]
+    if not kiosk_ids:
+        raise RuntimeError("Server reports no kiosks")
+
+    print("🔥 Warming up (one call per endpoint, excluded from results)")
+    await warm_up(base_url, kiosk_ids)
+
+    think_time = (0, 0) if args.no_think else THINK_TIME
+    levels = args.sweep if args.sweep else [args.concurrency]
+    summaries = []
+    for concurrency in levels:
+        summary = await run_level(base_url, kiosk_ids, concurrency, args.duration, think_time, sampler)
+        print_level(summary, show_timeline=not args.sweep)
+        summaries.append(summary)
+    return summaries
+
+
+def parse_sweep(value):
+    try:
+        levels = sorted({int(v) for v in value.split(',') if v.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected comma-separated integers, e.g. 1,2,4,8")
+    if not levels or levels[0] < 1:
+        raise argparse.ArgumentTypeError("concurrency levels must be >= 1")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Analytics API with simulated dashboard users")
+    parser.add_argument('--kiosks', type=int, default=DEFAULT_KIOSKS, help="kiosks in the generated fleet")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="days of transactions per kiosk")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="simultaneous users")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="seconds per load level")
+    parser.add_argument('--sweep', nargs='?', type=parse_sweep, const=DEFAULT_SWEEP,
+                        help="run a saturation sweep over concurrency levels (default: 1,2,4,...,64)")
+    parser.add_argument('--no-think', action='store_true', help="send requests back to back without think time")
+    parser.add_argument('--slo-p95-ms', type=float, default=DEFAULT_SLO_P95_MS, help="p95 latency objective")
+    parser.add_argument('--min-capacity', type=int, help="exit with status 1 if capacity under the SLO is lower")
+    parser.add_argument('--url', help="test an already running API instead of starting one (no CPU/RSS unless --pid)")
+    parser.add_argument('--pid', type=int, help="server process to sample CPU/RSS from when using --url")
+    parser.add_argument('--json', metavar='PATH', help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    process = None
+    tmp_dir = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+            sampler = ProcessSampler(args.pid) if args.pid else None
+        else:
+            tmp_dir = tempfile.TemporaryDirectory(prefix='kiosk_load_test_')
+            print(f"🏭 Generating fleet: {args.kiosks} kiosks x {args.days} days in {tmp_dir.name}")
+            generate_fleet(tmp_dir.name, args.kiosks, args.days)
+            print(f"🚀 Starting analytics_api.py on port {SERVER_PORT}")
+            process = start_server(tmp_dir.name, SERVER_PORT)
+            base_url = f"http://127.0.0.1:{SERVER_PORT}"
+            sampler = ProcessSampler(process.pid)
+
+        asyncio.run(wait_for_server(base_url, process))
+        summaries = asyncio.run(run(args, base_url, sampler))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    report = {'levels': summaries}
+    if args.sweep:
+        print_sweep(summaries, args.slo_p95_ms)
+    report['knee_concurrency'] = find_knee(summaries)
+    report['capacity_concurrency'] = capacity_under_slo(summaries, args.slo_p95_ms)
+    report['slo_p95_ms'] = args.slo_p95_ms
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+
+    if args.min_capacity is not None:
+        if report['capacity_concurrency'] < args.min_capacity:
+            print(f"❌ Capacity {report['capacity_concurrency']} is below required {args.min_capacity}")
+            sys.exit(1)
+        print(f"✅ Capacity {report['capacity_concurrency']} meets required {args.min_capacity}")
+
+
+if __name__ == '__main__':
+    main()
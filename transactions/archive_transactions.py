@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Archive closed months of kiosk transaction history
+Compresses daily transaction CSV files into monthly zip bundles (or per-day .csv.gz/.csv.zst files)
+that analytics_api.py reads directly without extracting to disk
+"""
+
+import os
+import re
+import sys
+import gzip
+import hashlib
+import shutil
+import zipfile
+import argparse
+from datetime import datetime
+from collections import defaultdict
+
+try:
+    import zstandard  # Optional: only needed for --format zst
+except ImportError:
+    zstandard = None
+
+# ============================================================================
+# CONFIGURATION - Adjust these values as needed
+# ============================================================================
+TRANSACTIONS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))  # transactions directory
+DEFAULT_FORMAT = 'zip'  # 'zip' (monthly bundle), 'gz' or 'zst' (per-day files)
+ZIP_COMPRESSION_LEVEL = 9
+GZIP_COMPRESSION_LEVEL = 9
+ZSTD_COMPRESSION_LEVEL = 19
+
+# Must match the filenames recognized by analytics_api.py
+TRANSACTION_FILE_PATTERN = re.compile(r'transactions_(\d+)_(\d{2})(\d{2})(\d{2})\.csv$')
+
+# ============================================================================
+# SCRIPT
+# ============================================================================
+
+def get_kiosk_directories(transactions_dir):
+    """Find all kiosk directories"""
+    kiosk_dirs = []
+    for item in os.listdir(transactions_dir):
+        item_path = os.path.join(transactions_dir, item)
+        if os.path.isdir(item_path) and item.startswith("kiosk_"):
+            kiosk_dirs.append(item_path)
+    return sorted(kiosk_dirs)
+
+
+def group_files_by_month(kiosk_dir):
+    """Group plain transaction CSV files in a kiosk directory by (kiosk_id, 'YYYYMM')"""
+    months = defaultdict(list)
+    for filename in sorted(os.listdir(kiosk_dir)):
+        match = TRANSACTION_FILE_PATTERN.match(filename)
+        if match:
+            kiosk_id, month, _, year = match.groups()
+            months[(kiosk_id, f"20{year}{month}")].append(filename)
+    return months
+
+
+def archive_month_zip(kiosk_dir, kiosk_id, month, filenames, dry_run):
+    """Bundle one month of CSV files into archive_KIOSK_YYYYMM.zip, then remove the originals"""
+    archive_path = os.path.join(kiosk_dir, f"archive_{kiosk_id}_{month}.zip")
+    print(f"  {os.path.basename(archive_path)} <- {len(filenames)} files")
+    if dry_run:
+        return
+
+    # Write to a temporary copy so a crash never leaves a half-written archive in place
+    tmp_path = archive_path + '.tmp'
+    if os.path.exists(archive_path):
+        shutil.copyfile(archive_path, tmp_path)
+    elif os.path.exists(tmp_path):
+        os.remove(tmp_path)  # Leftover from a crashed run; never append to it
+
+    archived = []
+    with zipfile.ZipFile(tmp_path, 'a', compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=ZIP_COMPRESSION_LEVEL) as archive:
+        existing = set(archive.namelist())
+        for filename in filenames:
+            if filename in existing:
+                print(f"  Warning: {filename} already archived, keeping loose copy")
+                continue
+            archive.write(os.path.join(kiosk_dir, filename), arcname=filename)
+            archived.append(filename)
+
+    with zipfile.ZipFile(tmp_path) as archive:
+        bad_member = archive.testzip()
+    if bad_member is not None:
+        os.remove(tmp_path)
+        raise IOError(f"Archive verification failed for {bad_member}")
+
+    os.replace(tmp_path, archive_path)
+    for filename in archived:
+        os.remove(os.path.join(kiosk_dir, filename))
+
+
+def file_digest(file):
+    """SHA-256 of an open binary stream, read in blocks"""
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(1024 * 1024), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def open_compressed(path, file_format):
+    """Open a .gz or .zst file for streaming decompression"""
+    if file_format == 'gz':
+        return gzip.open(path, 'rb')
+    return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+
+
+def compress_file(kiosk_dir, filename, file_format, dry_run):
+    """Compress one CSV file to .csv.gz or .csv.zst, then remove the original"""
+    src_path = os.path.join(kiosk_dir, filename)
+    dst_path = f"{src_path}.{file_format}"
+    if os.path.exists(dst_path):
+        print(f"  Warning: {os.path.basename(dst_path)} already exists, skipping")
+        return
+    if dry_run:
+        return
+
+    tmp_path = dst_path + '.tmp'
+    with open(src_path, 'rb') as src:
+        if file_format == 'gz':
+            with gzip.open(tmp_path, 'wb', compresslevel=GZIP_COMPRESSION_LEVEL) as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            with open(tmp_path, 'wb') as raw:
+                compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL)
+                with compressor.stream_writer(raw) as dst:
+                    shutil.copyfileobj(src, dst)
+
+    # Decompress the output and compare it with the source before deleting anything
+    with open(src_path, 'rb') as src, open_compressed(tmp_path, file_format) as dst:
+        verified = file_digest(src) == file_digest(dst)
+    if not verified:
+        os.remove(tmp_path)
+        raise IOError(f"Compression verification failed for {filename}")
+
+    os.replace(tmp_path, dst_path)
+    os.remove(src_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress closed months of kiosk transaction history")
+    parser.add_argument('--format', choices=['zip', 'gz', 'zst'], default=DEFAULT_FORMAT,
+                        help="zip: one archive per kiosk per month; gz/zst: compress each daily file")
+    parser.add_argument('--before', metavar='YYYY-MM', default=datetime.now().strftime('%Y-%m'),
+                        help="archive months strictly before this one (default: current month)")
+    parser.add_argument('--dry-run', action='store_true', help="show what would be archived without changing files")
+    args = parser.parse_args()
+
+    if args.format == 'zst' and zstandard is None:
+        print("Error: --format zst requires the zstandard package (pip install zstandard)")
+        sys.exit(1)
+
+    try:
+        cutoff = datetime.strptime(args.before, '%Y-%m').strftime('%Y%m')
+    except ValueError:
+        print(f"Error: invalid --before value '{args.before}', expected YYYY-MM")
+        sys.exit(1)
+
+    kiosk_dirs = get_kiosk_directories(TRANSACTIONS_DIRECTORY)
+    if not kiosk_dirs:
+        print("Error: No kiosk_* directories found in transactions directory")
+        return
+
+    for kiosk_dir in kiosk_dirs:
+        closed_months = {key: files for key, files in group_files_by_month(kiosk_dir).items() if key[1] < cutoff}
+        if not closed_months:
+            continue
+
+        print(f"Archiving {os.path.basename(kiosk_dir)} ({len(closed_months)} closed months)...")
+        for (kiosk_id, month), filenames in sorted(closed_months.items()):
+            try:
+                if args.format == 'zip':
+                    archive_month_zip(kiosk_dir, kiosk_id, month, filenames, args.dry_run)
+                else:
+                    print(f"  {month}: compressing {len(filenames)} files to .csv.{args.format}")
+                    for filename in filenames:
+                        compress_file(kiosk_dir, filename, args.format, args.dry_run)
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"Warning: failed to archive {kiosk_id} {month}: {e}")
+                continue
+
+    print("Done!")
+
+
+if __name__ == '__main__':
+    main()